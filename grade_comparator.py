@@ -1,14 +1,35 @@
 import pandas as pd
 import re
-from openpyxl import load_workbook
-from openpyxl.styles import PatternFill, Alignment
-from openpyxl.utils.dataframe import dataframe_to_rows
 import numpy as np
 import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Prefer the Rust-based calamine reader (pandas 2.2+); fall back to pandas' default engine without it
+try:
+    import python_calamine  # noqa: F401
+    EXCEL_READ_ENGINE = 'calamine'
+except ImportError:
+    EXCEL_READ_ENGINE = None
+
+# Copy-on-Write lets the renames, column subsets and merge share column buffers instead of
+# copying them (it is always on, and the option deprecated, from pandas 3.0)
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
 
 
 # --- GLOBAL HELPER FUNCTIONS ---
 
+# Patterns are compiled once at import time rather than looked up on every call
+_SHEET_DATE_RE = re.compile(r'(\d{1,2}-\d{1,2}-\d{4})')
+# Matches 1 or 2 digits for the day (\d{1,2})
+_FILE_DATE_RE = re.compile(r'(\d{1,2}[A-Za-z]{3}\d{4})', re.IGNORECASE)
+_CLASS_RE = re.compile(r'SHEN-([A-Za-z0-9]+)_grades', re.IGNORECASE)
+# Matches the dynamic 'Graded /XX' column header
+_GRADED_RE = re.compile(r'Graded\s*/\s*(\d+)')
+# Characters Excel does not allow in sheet names
+_SHEET_NAME_INVALID_RE = re.compile(r'[\[\]:*?/\\]')
+
+
 def get_file_path(file_name):
     """Ensures the file name has the .xlsx extension if it's missing."""
     if not file_name.lower().endswith('.xlsx'):
@@ -18,7 +39,7 @@ def get_file_path(file_name):
 
 def extract_date_from_sheet_name(sheet_name):
     """Extracts the grade snapshot date (MM-DD-YYYY) from the sheet name."""
-    match = re.search(r'(\d{1,2}-\d{1,2}-\d{4})', sheet_name)
+    match = _SHEET_DATE_RE.search(sheet_name)
     if match:
         return pd.to_datetime(match.group(1), format='%m-%d-%Y', errors='coerce')
     return None
@@ -26,54 +47,62 @@ def extract_date_from_sheet_name(sheet_name):
 
 def extract_date_from_file_path(file_path):
     """Extracts the grade snapshot date (D/DDMonYYYY) from the file name."""
-    # Updated regex to match 1 or 2 digits for the day (\d{1,2})
-    match = re.search(r'(\d{1,2}[A-Za-z]{3}\d{4})', file_path, re.IGNORECASE)
-    if match:
-        # Removed the deprecated argument infer_datetime_format=True
-        return pd.to_datetime(match.group(1), errors='coerce')
-    return None
+    return extract_dates_from_file_paths([file_path])[0]
+
+
+def extract_dates_from_file_paths(file_paths):
+    """
+    Extracts the grade snapshot dates (D/DDMonYYYY) from several file names,
+    parsing all of them in a single vectorized pd.to_datetime call.
+    Returns a list with NaT for any file name without a valid date.
+    """
+    date_strings = []
+    for file_path in file_paths:
+        match = _FILE_DATE_RE.search(file_path)
+        date_strings.append(match.group(1) if match else None)
+    return list(pd.to_datetime(date_strings, format='%d%b%Y', errors='coerce'))
 
 
 def extract_class_name(file_path):
     """Extracts the course code (e.g., MTH1Wa) from the file name."""
-    match = re.search(r'SHEN-([A-Za-z0-9]+)_grades', file_path, re.IGNORECASE)
+    match = _CLASS_RE.search(file_path)
     if match:
         return match.group(1).upper()
     return None
 
 
-def find_completed_assessment_count(df):
+def find_graded_column(columns):
+    """Finds the dynamic 'Graded /XX' column header (e.g., 'Graded /20') in a list of column names."""
+    for col in columns:
+        if _GRADED_RE.search(str(col)):
+            return col
+    return None
+
+
+def find_completed_assessment_count(df, graded_col_header):
     """
-    Finds the 'Graded /XX' column, and extracts the first non-null count
-    from the data values, which represents the number of completed assignments.
+    Extracts the first non-null count from the 'Graded /XX' column,
+    which represents the number of completed assignments (None if the column is blank).
+    This works because the count is uniform across all students in a snapshot.
     """
-    graded_col_header = None
-    for col in df.columns:
-        # Step 1: Find the header (e.g., 'Graded /20')
-        if re.search(r'Graded\s*/\s*\d+', str(col)):
-            graded_col_header = col
-            break
-
-    if graded_col_header is None:
+    first_valid_idx = df[graded_col_header].first_valid_index()
+    if first_valid_idx is None:
         return None
+    return int(df.at[first_valid_idx, graded_col_header])
 
-    # Step 2: Get the first non-NaN value in that column (the actual assessment count)
-    # This works because the count is uniform across all students in a snapshot.
-    first_valid_count = df[graded_col_header].dropna().iloc[0]
-
-    return int(first_valid_count)
 
-
-def validate_comparison_order(df_old, df_new):
+def validate_comparison_order(count_old, count_new, old_graded_col, new_graded_col):
     """
     Validates that the number of completed assessments in the older file
     is less than or equal to the number in the newer file.
+    The 'Graded /XX' headers tell a missing column apart from one that is present but blank.
     """
-    count_old = find_completed_assessment_count(df_old)
-    count_new = find_completed_assessment_count(df_new)
+    if old_graded_col is None or new_graded_col is None:
+        print("\n❌ COMPARISON ERROR: Could not find the 'Graded /XX' column header in one or both files.")
+        return False
 
     if count_old is None or count_new is None:
-        print("\n❌ COMPARISON ERROR: Could not find the 'Graded /XX' column header in one or both files.")
+        print("\n❌ COMPARISON ERROR: The 'Graded /XX' column is blank in one or both files.")
         return False
 
     if count_old > count_new:
@@ -87,219 +116,276 @@ def validate_comparison_order(df_old, df_new):
 
 # ----------------------------------------------------------------------------------
 
-def compare_student_grades(file_path_1, file_path_2):
-    """
-    Compares student grades between two Excel files, determines the most improved,
-    and generates a new, dynamically named, formatted Excel report.
-    Returns True on success, False on failure.
-    """
+# Grade changes within this many percentage points count as "no change"
+TINY_CHANGE_LIMIT = 0.01
+
 
-    def load_and_clean_data(file_path):
-        """Loads data, extracts date, cleans 'Course grade', and ensures all are scaled as percentages."""
-        excel_file = pd.ExcelFile(file_path)
+def load_and_clean_data(file_path):
+    """Loads data, extracts date, cleans 'Course grade', and ensures all are scaled as percentages."""
+    # The workbook is opened (and unzipped) once; the sheet name, header and data all come from it
+    with pd.ExcelFile(file_path, engine=EXCEL_READ_ENGINE) as excel_file:
         sheet_name = excel_file.sheet_names[0]
-        df = pd.read_excel(file_path, sheet_name=sheet_name)
 
-        # 1. Try date extraction
-        date = extract_date_from_sheet_name(sheet_name)
-        if pd.isna(date):
-            date = extract_date_from_file_path(file_path)
+        # Pre-scan the header row so only the columns the report uses are parsed:
+        # the three identifier columns, 'Course grade' and the 'Graded /XX' column.
+        # (selected by position, since usecols rejects a mix of text and numeric header cells)
+        header = excel_file.parse(sheet_name, nrows=0).columns
+        graded_col = find_graded_column(header)
+        used_names = ['Course grade'] + ([graded_col] if graded_col is not None else [])
+        usecols = sorted({0, 1, 2} | {i for i, col in enumerate(header) if col in used_names})
+        df = excel_file.parse(sheet_name, usecols=usecols)
+
+    # 1. Try date extraction
+    date = extract_date_from_sheet_name(sheet_name)
+    if pd.isna(date):
+        date = extract_date_from_file_path(file_path)
+
+    if pd.isna(date):
+        raise ValueError(f"Could not extract a valid date from the file: {file_path}")
+
+    # Clean 'Course grade' column: remove every '%' (skipped when the column is already numeric)
+    course_grade = df['Course grade']
+    if pd.api.types.is_numeric_dtype(course_grade):
+        grade_series = course_grade.astype('float64')
+    else:
+        grade_series = pd.to_numeric(course_grade.astype(str).str.replace('%', '', regex=False), errors='coerce')
 
-        if pd.isna(date):
-            raise ValueError(f"Could not extract a valid date from the file: {file_path}")
+    # *** ULTIMATE SCALING FIX: Scale individual values that look like decimals ***
+    # (own copy of the values: copy-on-write pandas may hand back a read-only view)
+    grade_values = grade_series.to_numpy(dtype=np.float64, copy=True)
+    is_decimal = (grade_values > 0.0) & (grade_values < 1.5)
 
-        # Clean 'Course grade' column: remove '%'
-        df['Course grade'] = df['Course grade'].astype(str).str.replace('%', '', regex=False)
-        grade_series = pd.to_numeric(df['Course grade'], errors='coerce')
+    # Apply multiplication only to those specific values, in place in one vectorized pass
+    np.multiply(grade_values, 100, out=grade_values, where=is_decimal)
 
-        # *** ULTIMATE SCALING FIX: Scale individual values that look like decimals ***
-        is_decimal = (grade_series > 0.0) & (grade_series < 1.5)
+    df['Course grade'] = grade_values
 
-        # Apply multiplication only to those specific values
-        grade_series.loc[is_decimal] = grade_series.loc[is_decimal] * 100
+    # The completed-assessment count is read here so validation needs no second scan
+    graded_count = find_completed_assessment_count(df, graded_col) if graded_col is not None else None
 
-        df['Course grade'] = grade_series
+    return df, date, sheet_name, graded_col, graded_count
 
-        return df, date, sheet_name
 
-    # --- 1. Load Data and Extract Dates ---
-    try:
-        df1, date1, sheet_name1 = load_and_clean_data(file_path_1)
-        df2, date2, sheet_name2 = load_and_clean_data(file_path_2)
+def order_by_file_name_dates(file_path_1, file_path_2):
+    """
+    Orders a pair of snapshot files older-first using the dates in their file names, without opening them,
+    so the older file is loaded first. Only the load order is decided here: the snapshot dates used for
+    the comparison still come from the workbooks (sheet name first, then file name).
+    """
+    path_date1, path_date2 = extract_dates_from_file_paths([file_path_1, file_path_2])
+    if not pd.isna(path_date1) and not pd.isna(path_date2) and path_date2 < path_date1:
+        return file_path_2, file_path_1
+    return file_path_1, file_path_2
 
-    except Exception as e:
-        print(f"❌ An error occurred during file loading: {e}")
-        return False
 
-        # --- 2. Determine Earlier/Later File and Rename Columns ---
+def build_comparison(snapshot_1, snapshot_2):
+    """
+    Compares two loaded snapshots (as returned by load_and_clean_data): merges them, calculates
+    the grade change and tags the most improved and biggest drop students.
+    Returns (final_df, fill_category, class_name, date_new), or None if the comparison is invalid.
+    """
+    df1, date1, _, graded_col1, graded_count1 = snapshot_1
+    df2, date2, _, graded_col2, graded_count2 = snapshot_2
+
+    # --- 2. Determine Earlier/Later File and Rename Columns ---
     if date1 < date2:
         df_old, df_new = df1, df2
         date_new = date2
+        old_graded_col, new_graded_col = graded_col1, graded_col2
+        count_old, count_new = graded_count1, graded_count2
     elif date2 < date1:
         df_old, df_new = df2, df1
         date_new = date1
+        old_graded_col, new_graded_col = graded_col2, graded_col1
+        count_old, count_new = graded_count2, graded_count1
     else:
         print("⚠️ Warning: Both files have the same snapshot date. Comparison aborted.")
-        return False
+        return None
 
         # *** VALIDATION CHECK ***
-    if not validate_comparison_order(df_old, df_new):
-        return False
+    if not validate_comparison_order(count_old, count_new, old_graded_col, new_graded_col):
+        return None
 
-        # Dynamic Output File Naming
     class_name = df_new.iloc[0][df_new.columns[1]]
     class_name = class_name.replace('/', '-')
-    output_file = f"{class_name}_Grade_Comparison_Report_{date_new.strftime('%d%b%Y')}.xlsx"
     print(f"🔍 Older snapshot date: {date1.strftime('%m-%d-%Y')}. Newer snapshot date: {date2.strftime('%m-%d-%Y')}.")
 
-    # Logic to identify the dynamic 'Graded/...' column headers
-    def find_graded_col(df):
-        for col in df.columns:
-            if 'Graded' in str(col) and '/' in str(col):
-                return col
-        return None
-
-    old_graded_col = find_graded_col(df_old)
-    new_graded_col = find_graded_col(df_new)
-
-    if not old_graded_col or not new_graded_col:
-        print(f"❌ Error: Could not find the 'Graded/...' column in one or both files.")
-        return False
-
         # Select and rename columns for clarity before merging
     df_old = df_old.rename(columns={'Course grade': 'Previous Course Grade (%)'})
     df_new = df_new.rename(columns={'Course grade': 'Current Course Grade (%)',
                                     new_graded_col: 'Current Graded Assessments'})
 
     # --- 3. Merge Data and Calculate Grade Change ---
-    merge_key = df_old.columns[2]
-    cols_to_keep_old = [df_old.columns[0], df_old.columns[1], df_old.columns[2], 'Previous Course Grade (%)']
-    df_old_data = df_old[cols_to_keep_old]
-    cols_to_keep_new = [df_new.columns[2], 'Current Course Grade (%)', 'Current Graded Assessments']
-    df_new_data = df_new[cols_to_keep_new]
+    # Identifier column names are looked up once; the third one (student) is the merge key
+    id_cols = list(df_old.columns[:3])
+    merge_key = id_cols[2]
+    cols_to_keep_old = id_cols + ['Previous Course Grade (%)']
+    cols_to_keep_new = [merge_key, 'Current Course Grade (%)', 'Current Graded Assessments']
+
+    try:
+        # one_to_one: a student listed twice in either snapshot would silently multiply rows
+        merged_df = pd.merge(df_old.loc[:, cols_to_keep_old], df_new.loc[:, cols_to_keep_new],
+                             on=merge_key, how='inner', validate='one_to_one')
+    except pd.errors.MergeError:
+        print(f"❌ Error: Duplicate entries found in the '{merge_key}' column of one or both files.")
+        return None
 
-    merged_df = pd.merge(df_old_data, df_new_data, on=merge_key, how='inner')
     merged_df['Grade Change (%)'] = (
             merged_df['Current Course Grade (%)'] - merged_df['Previous Course Grade (%)']
     )
 
     # --- 4. Final Data Structure and Most Improved Student(s) (INCLUDING DECLINE) ---
-    final_columns = [
-        df_old.columns[0], df_old.columns[1], df_old.columns[2],
+    final_columns = id_cols + [
         'Current Graded Assessments', 'Previous Course Grade (%)',
         'Current Course Grade (%)', 'Grade Change (%)'
     ]
-    final_df = merged_df[final_columns].copy()
-
-    # Find MOST IMPROVED (MAX CHANGE)
-    max_change = final_df['Grade Change (%)'].max()
-    TINY_CHANGE_LIMIT = 0.01
+    # reindex instead of a defensive .copy(): the two tag columns are allocated up front and,
+    # with Copy-on-Write, the data columns are only copied if they are actually modified
+    final_df = merged_df.reindex(columns=final_columns + ['Most Improved Student(s)', 'Biggest Decline'])
+    del merged_df
 
-    if max_change > TINY_CHANGE_LIMIT:
-        most_improved_students = final_df[final_df['Grade Change (%)'] == max_change][df_old.columns[2]].tolist()
-    else:
-        not_significantly_worse = final_df[final_df['Grade Change (%)'] >= -TINY_CHANGE_LIMIT]
-        if not not_significantly_worse.empty:
-            max_current_grade = not_significantly_worse['Current Course Grade (%)'].max()
-            most_improved_students = not_significantly_worse[
-                not_significantly_worse['Current Course Grade (%)'] == max_current_grade
-                ][df_old.columns[2]].tolist()
-        else:
-            most_improved_students = final_df[final_df['Grade Change (%)'] == max_change][df_old.columns[2]].tolist()
+    if final_df.empty:
+        print(f"❌ Error: No student in the '{merge_key}' column appears in both files. Comparison aborted.")
+        return None
 
-    final_df['Most Improved Student(s)'] = final_df[final_df.columns[2]].apply(
-        lambda x: '🥇 MOST IMPROVED' if x in most_improved_students else ''
-    )
+    # Find MOST IMPROVED (MAX CHANGE)
+    # Works on the raw NumPy columns so no intermediate DataFrames are sliced out
+    grade_changes = final_df['Grade Change (%)'].to_numpy(dtype=float)
+    # With no grade change at all (every grade blank) nobody is tagged
+    has_grade_changes = not np.isnan(grade_changes).all()
+    max_change = np.nanmax(grade_changes) if has_grade_changes else np.nan
+
+    winners_idx = np.flatnonzero(grade_changes == max_change)
+    if has_grade_changes and max_change <= TINY_CHANGE_LIMIT:
+        not_significantly_worse = grade_changes >= -TINY_CHANGE_LIMIT
+        if not_significantly_worse.any():
+            current_grades = np.where(not_significantly_worse,
+                                      final_df['Current Course Grade (%)'].to_numpy(dtype=float), -np.inf)
+            winners_idx = np.flatnonzero(current_grades == np.nanmax(current_grades))
+
+    student_names = final_df[merge_key]
+    most_improved_students = frozenset(student_names.to_numpy()[winners_idx].tolist())
+
+    # Vectorized tagging: one hashed isin pass over the name column instead of a per-row apply(),
+    # masked onto a blank StringDtype Series so the label is a pandas string column (no ndarray round-trip)
+    no_label = pd.Series('', index=final_df.index, dtype='string')
+    improved_mask = student_names.isin(most_improved_students)
+    final_df['Most Improved Student(s)'] = no_label.mask(improved_mask, '🥇 MOST IMPROVED')
 
     # *** ADDED: Find MOST DECLINED (MIN CHANGE) ***
-    min_change = final_df['Grade Change (%)'].min()
+    min_change = np.nanmin(grade_changes) if has_grade_changes else np.nan
 
-    most_declined_students = final_df[final_df['Grade Change (%)'] == min_change][df_old.columns[2]].tolist()
+    most_declined_students = frozenset(student_names.to_numpy()[grade_changes == min_change].tolist())
 
     # Column I: Biggest Decline (Moved from H to I to accommodate the new column J)
-    final_df['Biggest Decline'] = final_df[final_df.columns[2]].apply(
-        lambda x: '🔻 BIGGEST DROP' if x in most_declined_students else ''
-    )
-
-    # --- 5. Output to Formatted Excel ---
-
-    try:
-        # Save the unformatted data to a temporary Excel writer
-        writer = pd.ExcelWriter(output_file, engine='openpyxl')
-        final_df.to_excel(writer, index=False, sheet_name='Grade Report')
-        writer.close()
-
-        # Reload the workbook to apply conditional formatting and styling
-        wb = load_workbook(output_file)
-        ws = wb['Grade Report']
-
-        # --- Column Width Adjustment ---
-        for column in ws.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(cell.value)
-                except:
-                    pass
-            adjusted_width = (max_length + 2)
-            ws.column_dimensions[column_letter].width = adjusted_width
-        # --- End Column Width Adjustment ---
-
-        # --- Code for Column Centering (D to I) ---
-        center_alignment = Alignment(horizontal='center', vertical='center')
-        # Center Columns D (index 4) through J (index 10)
-        for col_idx in range(4, 11):  # <-- Range adjusted to cover new Column I (index 9) and J (index 10)
-            for row_idx in range(1, ws.max_row + 1):
-                ws.cell(row=row_idx, column=col_idx).alignment = center_alignment
-        # --- End Code for Column Centering ---
-
-        # Define fill colors
-        fill_green = PatternFill(start_color="90EE90", end_color="90EE90", fill_type="solid")
-        fill_red = PatternFill(start_color="F08080", end_color="F08080", fill_type="solid")
-        fill_cyan = PatternFill(start_color="E0FFFF", end_color="E0FFFF", fill_type="solid")
-        fill_yellow = PatternFill(start_color="FFFFCC", end_color="FFFFCC", fill_type="solid")
+    declined_mask = student_names.isin(most_declined_students)
+    final_df['Biggest Decline'] = no_label.mask(declined_mask, '🔻 BIGGEST DROP')
+
+    # Fill category for every Grade Change cell, computed in one vectorized pass:
+    # 0 = winner (green), 1 = biggest drop (purple), 2 = no change (yellow),
+    # 3 = negative (red), 4 = positive (cyan), 5 = blank grade change (no fill)
+    is_winner = final_df['Most Improved Student(s)'].to_numpy() == '🥇 MOST IMPROVED'
+    is_decline = final_df['Biggest Decline'].to_numpy() == '🔻 BIGGEST DROP'
+    is_no_change = np.abs(grade_changes) <= TINY_CHANGE_LIMIT
+    fill_category = np.select(
+        [np.isnan(grade_changes), is_winner, is_decline, is_no_change, grade_changes < 0, grade_changes > 0],
+        [5, 0, 1, 2, 3, 4], default=5)
+
+    # No-change winners and other no-change students are written as a clean 0.0
+    final_df.loc[is_no_change & ((fill_category == 0) | (fill_category == 2)), 'Grade Change (%)'] = 0.0
+
+    return final_df, fill_category, class_name, date_new
+
+
+def create_report_writer(output_file):
+    """Opens an xlsxwriter-backed ExcelWriter for a report file."""
+    # Every string in the report is plain text, so xlsxwriter's per-string formula/URL
+    # detection is switched off (this also keeps names like '=...' from becoming formulas)
+    xlsx_options = {'strings_to_formulas': False, 'strings_to_urls': False}
+    return pd.ExcelWriter(output_file, engine='xlsxwriter', engine_kwargs={'options': xlsx_options})
+
+
+def add_report_formats(wb):
+    """Pre-allocates the formats used by the report sheets; one set is shared by every sheet in a workbook."""
+    center = {'align': 'center', 'valign': 'vcenter'}
+    return {
+        'center': wb.add_format(center),
+        'header': wb.add_format({**center, 'bold': True, 'border': 1}),
+        'green': wb.add_format({'bg_color': '#90EE90'}),
+        'green_zero': wb.add_format({'bg_color': '#90EE90', 'num_format': '0.00'}),
+        'red': wb.add_format({'bg_color': '#F08080'}),
+        'cyan': wb.add_format({'bg_color': '#E0FFFF'}),
+        'yellow_zero': wb.add_format({'bg_color': '#FFFFCC', 'num_format': '0.00'}),
         # *** ADDED NEW COLOR ***
-        fill_purple = PatternFill(start_color="D8BFD8", end_color="D8BFD8", fill_type="solid")
-
-        for row_idx in range(2, ws.max_row + 1):
-            grade_change_cell = ws.cell(row=row_idx, column=7)  # Column G: Grade Change
-            winner_status_cell = ws.cell(row=row_idx, column=8)  # Column H: Most Improved
-            decline_status_cell = ws.cell(row=row_idx, column=9)  # Column I: Biggest Decline (New)
-            grade_change_value = grade_change_cell.value
-
-            if pd.isna(grade_change_value): continue
-
-            # --- 1. WINNER IS ALWAYS GREEN (Highest Priority) ---
-            if winner_status_cell.value == '🥇 MOST IMPROVED':
-                grade_change_cell.fill = fill_green
+        'purple': wb.add_format({'bg_color': '#D8BFD8'}),
+    }
 
-                # Apply '0.00' format IF the change is zero
-                if abs(grade_change_value) <= TINY_CHANGE_LIMIT:
-                    grade_change_cell.value = 0.0
-                    grade_change_cell.number_format = '0.00'
 
-            # *** ADDED: BIGGEST DROP IS PURPLE ***
-            elif decline_status_cell.value == '🔻 BIGGEST DROP':
-                grade_change_cell.fill = fill_purple
-
-            # --- 2. OTHER NO-CHANGE STUDENTS ARE YELLOW ---
-            elif abs(grade_change_value) <= TINY_CHANGE_LIMIT:
-                grade_change_cell.fill = fill_yellow
-                grade_change_cell.value = 0.0
-                grade_change_cell.number_format = '0.00'
+def write_report_sheet(writer, sheet_name, final_df, fill_category, formats):
+    """
+    Writes one comparison to a sheet of an open xlsxwriter ExcelWriter in a single pass:
+    data, column widths, centering and the Grade Change fills.
+    """
+    final_df.to_excel(writer, index=False, sheet_name=sheet_name)
+    ws = writer.sheets[sheet_name]
+
+    # --- Column Width Adjustment ---
+    # Longest of header and values per column, measured in pandas rather than cell by cell
+    value_lengths = final_df.astype(str).apply(lambda col: col.str.len().max()).fillna(0).to_numpy()
+    col_widths = np.maximum(final_df.columns.astype(str).str.len().to_numpy(), value_lengths) + 2
+    for col_idx, width in enumerate(col_widths):
+        # Center Columns D (index 3) through I (index 8)
+        col_format = formats['center'] if col_idx >= 3 else None
+        ws.set_column(col_idx, col_idx, int(width), col_format)
+    # Column J is kept centered as before
+    ws.set_column(9, 9, None, formats['center'])
+    # --- End Column Width Adjustment ---
+
+    # Header cells carry pandas' own format, so re-write D onward centered
+    for col_idx in range(3, len(final_df.columns)):
+        ws.write(0, col_idx, final_df.columns[col_idx], formats['header'])
+
+    # --- Grade Change fills (Column G) as native Excel conditional formatting ---
+    # Rules are evaluated in order and stop at the first match, mirroring the priority below.
+    last_row = len(final_df)
+    grade_change_range = f'G2:G{last_row + 1}'
+    limit = TINY_CHANGE_LIMIT
+    fill_rules = [
+        # --- 1. WINNER IS ALWAYS GREEN (Highest Priority), '0.00' IF the change is zero ---
+        (0, 'formula', f'=AND($H2="🥇 MOST IMPROVED",ABS($G2)<={limit})', formats['green_zero']),
+        (0, 'formula', '=$H2="🥇 MOST IMPROVED"', formats['green']),
+        # *** ADDED: BIGGEST DROP IS PURPLE ***
+        (1, 'formula', '=$I2="🔻 BIGGEST DROP"', formats['purple']),
+        # --- 2. OTHER NO-CHANGE STUDENTS ARE YELLOW (blank grade changes stay unstyled) ---
+        (2, 'formula', f'=AND(ISNUMBER($G2),ABS($G2)<={limit})', formats['yellow_zero']),
+        # --- 3. NEGATIVE CHANGE IS RED ---
+        (3, 'cell', '<', formats['red']),
+        # --- 4. POSITIVE (NON-WINNING) CHANGE IS CYAN ---
+        (4, 'cell', '>', formats['cyan']),
+    ]
+    # Only emit the rules for categories that actually occur in this report
+    categories_present = set(np.unique(fill_category).tolist())
+    for category, rule_type, criteria, fill in fill_rules:
+        if category not in categories_present:
+            continue
+        if rule_type == 'formula':
+            rule = {'type': 'formula', 'criteria': criteria}
+        else:
+            rule = {'type': 'cell', 'criteria': criteria, 'value': 0}
+        ws.conditional_format(grade_change_range, {**rule, 'format': fill, 'stop_if_true': True})
 
-            # --- 3. NEGATIVE CHANGE IS RED ---
-            elif grade_change_value < 0:
-                grade_change_cell.fill = fill_red
 
-            # --- 4. POSITIVE (NON-WINNING) CHANGE IS CYAN ---
-            elif grade_change_value > 0:
-                grade_change_cell.fill = fill_cyan
+def save_report(output_file, write_sheets, success_message):
+    """
+    Saves a report workbook in a single write pass: write_sheets(writer) adds the sheets to an
+    open xlsxwriter ExcelWriter, so there is no reload/re-save of the workbook afterwards.
+    Reports save errors and pauses the console before returning. Returns True on success, False on failure.
+    """
+    try:
+        with create_report_writer(output_file) as writer:
+            write_sheets(writer)
 
-        wb.save(output_file)
-        print(f"\n✅ Success! Report generated and saved as '{output_file}'")
+        print(f"\n✅ Success! {success_message}")
         return True  # SUCCESS EXIT
 
     except PermissionError:
@@ -316,6 +402,110 @@ def compare_student_grades(file_path_1, file_path_2):
         input("✅ Processing complete. Press Enter to exit and view the output file.")
 
 
+def compare_student_grades(file_path_1, file_path_2):
+    """
+    Compares student grades between two Excel files, determines the most improved,
+    and generates a new, dynamically named, formatted Excel report.
+    Returns True on success, False on failure.
+    """
+
+    # --- 1. Load Data and Extract Dates ---
+    # The file names normally carry the snapshot dates, so the older file is loaded first
+    file_path_1, file_path_2 = order_by_file_name_dates(file_path_1, file_path_2)
+
+    try:
+        snapshot_1 = load_and_clean_data(file_path_1)
+        snapshot_2 = load_and_clean_data(file_path_2)
+
+    except Exception as e:
+        print(f"❌ An error occurred during file loading: {e}")
+        return False
+
+    # --- 2. to 4. Validate, Merge and Tag Students ---
+    comparison = build_comparison(snapshot_1, snapshot_2)
+    if comparison is None:
+        return False
+    final_df, fill_category, class_name, date_new = comparison
+
+    # Dynamic Output File Naming
+    output_file = f"{class_name}_Grade_Comparison_Report_{date_new.strftime('%d%b%Y')}.xlsx"
+
+    # --- 5. Output to Formatted Excel ---
+    def write_sheets(writer):
+        write_report_sheet(writer, 'Grade Report', final_df, fill_category, add_report_formats(writer.book))
+
+    return save_report(output_file, write_sheets, f"Report generated and saved as '{output_file}'")
+
+
+def compare_many(file_pairs):
+    """
+    Batch mode: compares several (older, newer) file pairs in one run and generates a single
+    formatted Excel report with one sheet per pair. Every distinct snapshot file is read once,
+    in parallel, and one set of formats is shared by all the sheets.
+    Returns True if the report was saved, False on failure.
+    """
+    ordered_pairs = [order_by_file_name_dates(file_1, file_2) for file_1, file_2 in file_pairs]
+
+    # --- 1. Load Data and Extract Dates (all files at once) ---
+    # Keyed by path so a file shared by several pairs is read once
+    load_paths = dict.fromkeys(path for pair in ordered_pairs for path in pair)
+    with ThreadPoolExecutor() as executor:
+        loads = {path: executor.submit(load_and_clean_data, path) for path in load_paths}
+
+    # --- 2. to 4. Validate, Merge and Tag Students for each pair ---
+    comparisons = []
+    for file_path_1, file_path_2 in ordered_pairs:
+        print(f"\n📄 {os.path.basename(file_path_1)} vs {os.path.basename(file_path_2)}")
+        try:
+            snapshot_1 = loads[file_path_1].result()
+            snapshot_2 = loads[file_path_2].result()
+        except Exception as e:
+            print(f"❌ An error occurred during file loading: {e}")
+            continue
+
+        # A pair that cannot be compared is skipped instead of aborting the whole batch
+        try:
+            comparison = build_comparison(snapshot_1, snapshot_2)
+        except Exception as e:
+            print(f"❌ An error occurred during the comparison: {e}")
+            continue
+        if comparison is not None:
+            comparisons.append(comparison)
+
+    if not comparisons:
+        print("\n❌ ERROR: None of the file pairs could be compared. No report generated.")
+        return False
+
+    # Dynamic Output File Naming (dated by the newest snapshot in the batch)
+    latest_date = max(date_new for _, _, _, date_new in comparisons)
+    output_file = f"Batch_Grade_Comparison_Report_{latest_date.strftime('%d%b%Y')}.xlsx"
+
+    # --- 5. Output to Formatted Excel ---
+    def write_sheets(writer):
+        formats = add_report_formats(writer.book)
+        used_sheet_names = set()
+        for final_df, fill_category, class_name, date_new in comparisons:
+            # Excel sheet names are at most 31 characters, unique, and without []:*?/\
+            # The newer snapshot date tells apart pairs of the same class; the class part is
+            # shortened (never the date) and a number is added only if the name still clashes
+            class_label = _SHEET_NAME_INVALID_RE.sub('-', str(class_name))
+            date_label = f" {date_new.strftime('%d%b')}"
+            suffix = ''
+            copy_number = 2
+            while True:
+                sheet_name = class_label[:31 - len(date_label) - len(suffix)] + date_label + suffix
+                if sheet_name.lower() not in used_sheet_names:
+                    break
+                suffix = f" ({copy_number})"
+                copy_number += 1
+            used_sheet_names.add(sheet_name.lower())
+
+            write_report_sheet(writer, sheet_name, final_df, fill_category, formats)
+
+    return save_report(output_file, write_sheets,
+                       f"{len(comparisons)} of {len(file_pairs)} comparisons saved in '{output_file}'")
+
+
 # --- EXECUTION ---
 
 # Define the file names used for the default option
@@ -323,8 +513,54 @@ DEFAULT_FILE_1 = 'SHEN-MTH1Wa_grades_28Nov2025.xlsx'
 DEFAULT_FILE_2 = 'SHEN-MTH1Wa_grades_30Nov2025.xlsx'
 
 
+def validate_file_pair(file1, file2):
+    """
+    Checks that both files exist and belong to the same class.
+    Returns (class name, None) when the pair is valid, or (None, error message) otherwise.
+    """
+    if not (os.path.exists(file1) and os.path.exists(file2)):
+        return None, "One or both files were not found."
+
+    class1 = extract_class_name(file1)
+    class2 = extract_class_name(file2)
+
+    if not class1 or not class2:
+        return None, "Could not identify class name (e.g., MTH1Wa) in one or both file names."
+    if class1 != class2:
+        return None, "Class mismatch! Please enter files for the same course."
+    return class1, None
+
+
+def get_batch_file_pairs():
+    """Prompts for OLDER/NEWER file pairs until an empty OLDER file name is entered; invalid pairs are skipped."""
+    print("ℹ️ Enter one pair at a time. Leave the OLDER file name empty to finish.")
+    file_pairs = []
+
+    while True:
+        pair_number = len(file_pairs) + 1
+        raw_input_1 = input(f"Pair {pair_number} - Enter OLDER snapshot file name: ").strip()
+        if not raw_input_1:
+            return file_pairs
+        raw_input_2 = input(f"Pair {pair_number} - Enter NEWER snapshot file name: ").strip()
+
+        file1 = get_file_path(raw_input_1)
+        file2 = get_file_path(raw_input_2)
+
+        class_name, error = validate_file_pair(file1, file2)
+        if error:
+            print(f"\n❌ ERROR: {error} Pair skipped.")
+            continue
+
+        print(f"✅ Class match ({class_name}). Pair {pair_number} added.")
+        file_pairs.append((file1, file2))
+
+
 def get_file_paths():
-    """Presents an interactive menu to get file paths from the user and validates class names."""
+    """
+    Presents an interactive menu to get file paths from the user and validates class names.
+    Returns (file pairs, batch mode): a list of (older, newer) file pairs (one pair for options
+    1 and 2, any number for option 3, empty once the retries run out) and whether batch mode was chosen.
+    """
     print("\n=============================================")
     print("           GRADE COMPARISON TOOL")
     print("=============================================")
@@ -332,13 +568,14 @@ def get_file_paths():
     print("---------------------------------------------")
     print(f"1. Use Default Files: ({DEFAULT_FILE_1} & {DEFAULT_FILE_2})")
     print("2. Enter File Names Manually (no need to type .xlsx)")
+    print("3. Batch Mode: Compare Several File Pairs into One Report")
     print("---------------------------------------------")
 
     max_retries = 3
     retries = 0
 
     while retries < max_retries:
-        choice = input("Enter choice (1 or 2): ").strip()
+        choice = input("Enter choice (1, 2 or 3): ").strip()
 
         if choice == '1':
             file1, file2 = DEFAULT_FILE_1, DEFAULT_FILE_2
@@ -350,7 +587,7 @@ def get_file_paths():
 
                 if class1 and class2 and class1 == class2:
                     print(f"✅ Using default files.")
-                    return file1, file2
+                    return [(file1, file2)], False
                 else:
                     print("\n❌ ERROR: Default files class mismatch or not properly named. RETRYING...")
                     retries += 1
@@ -369,36 +606,33 @@ def get_file_paths():
             file1 = get_file_path(raw_input_1)
             file2 = get_file_path(raw_input_2)
 
-            if os.path.exists(file1) and os.path.exists(file2):
-                # Validation
-                class1 = extract_class_name(file1)
-                class2 = extract_class_name(file2)
+            # Validation
+            class_name, error = validate_file_pair(file1, file2)
 
-                if not class1 or not class2:
-                    print(
-                        "\n❌ ERROR: Could not identify class name (e.g., MTH1Wa) in one or both file names. RETRYING...")
-                    retries += 1
-                    continue
-
-                if class1 == class2:
-                    print(f"✅ Class match ({class1}). Files found.")
-                    return file1, file2
-                else:
-                    print("\n❌ ERROR: Class mismatch! Please enter files for the same course. RETRYING...")
-                    retries += 1
-                    continue
-            else:
-                print("\n❌ ERROR: One or both files were not found. RETRYING...")
+            if error:
+                print(f"\n❌ ERROR: {error} RETRYING...")
                 retries += 1
                 continue
 
+            print(f"✅ Class match ({class_name}). Files found.")
+            return [(file1, file2)], False
+
+        elif choice == '3':
+            file_pairs = get_batch_file_pairs()
+            if file_pairs:
+                return file_pairs, True
+
+            print("\n❌ ERROR: No valid file pairs were entered. RETRYING...")
+            retries += 1
+            continue
+
         else:
-            print("Invalid choice. Please enter 1 or 2. RETRYING...")
+            print("Invalid choice. Please enter 1, 2 or 3. RETRYING...")
             retries += 1
             continue
 
     print(f"\n🚫 Maximum {max_retries} retries reached. Terminating program.")
-    return None, None
+    return [], False
 
 
 # --- MAIN PROGRAM LOOP ---
@@ -406,13 +640,16 @@ def get_file_paths():
 def main():
     while True:
         # 1. Get file paths and run comparison
-        file_1_path, file_2_path = get_file_paths()
+        file_pairs, batch_mode = get_file_paths()
 
-        if file_1_path is not None:
-            # Only run comparison if valid files were returned
-            compare_student_grades(file_1_path, file_2_path)
+        # Only run comparison if valid files were returned
+        if batch_mode:
+            # Batch mode: all pairs (even a single one) go into one batch report workbook
+            compare_many(file_pairs)
+        elif file_pairs:
+            compare_student_grades(*file_pairs[0])
 
-        # The compare_student_grades function contains the final input() pause,
+        # The compare_student_grades and compare_many functions contain the final input() pause,
         # so this loop restarts after the user hits Enter inside that function.
 
         # 2. Add "Run Again" Option (CHANGE 2)